@@ -1,7 +1,6 @@
 # app.py
 import streamlit as st
 st.set_page_config(page_title="LBS Bina Competitor Dashboard", layout="wide")
-st.cache_data.clear()
 
 import stock_monitoring, financials, balance_sheet, cash_flow, overview, dividend, profitability_metrics, esg
 
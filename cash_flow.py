@@ -2,27 +2,12 @@
 import streamlit as st
 import pandas as pd
 import yfinance as yf
+from tickers import BASE_COMPANY, COMPANIES as companies
+from yf_session import SESSION
+from concurrent_fetch import run_concurrently
+from statement_table import build_csv_bytes, statement_table_styles
 
 # ── CONFIG ────────────────────────────────────────────────────────────────────
-BASE_COMPANY = "LBS Bina"
-
-companies = {
-    "LBS Bina": "5789.KL",
-    "S P Setia": "8664.KL",
-    "Sime Darby Property": "5288.KL",
-    "Eco World": "8206.KL",
-    "UEM Sunrise": "5148.KL",
-    "IOI Properties": "5249.KL",
-    "Mah Sing": "8583.KL",
-    "IJM Corporation": "3336.KL",
-    "Sunway": "5211.KL",
-    "Gamuda": "5398.KL",
-    "OSK Holdings": "5053.KL",
-    "UOA Development": "5200.KL",
-    "Matrix Concepts": "5236.KL",
-    "Lagenda Properties": "7179.KL",
-}
-
 ROW_ORDER = [
     "Operating Cash Flow",
     "Investing Cash Flow",
@@ -35,32 +20,40 @@ ROW_ORDER = [
     "Repurchase of Capital Stock",
     "Free Cash Flow",
 ]
+ROW_ORDER_IDX = pd.Index(ROW_ORDER)
 
 # ── DATA FETCHING ─────────────────────────────────────────────────────────────
 @st.cache_data(ttl=3600, show_spinner=False)
 def fetch_cash_flow(ticker_code: str) -> pd.DataFrame:
     """Returns DataFrame: index=ROW_ORDER, columns=quarter Timestamps, scaled to thousands."""
-    ticker = yf.Ticker(ticker_code)
+    ticker = yf.Ticker(ticker_code, session=SESSION)
     df = ticker.quarterly_cashflow
     if df is None or df.empty:
-        return pd.DataFrame(index=ROW_ORDER)
-    try:
-        df.columns = pd.to_datetime(df.columns)
-    except Exception:
-        df.columns = pd.to_datetime([str(c) for c in df.columns], errors="coerce")
-    df = df.reindex(ROW_ORDER)
-    df = df.apply(pd.to_numeric, errors="coerce")
+        return pd.DataFrame(index=ROW_ORDER_IDX)
+    if not isinstance(df.columns, pd.DatetimeIndex):
+        try:
+            df.columns = pd.to_datetime(df.columns)
+        except Exception:
+            df.columns = pd.to_datetime([str(c) for c in df.columns], errors="coerce")
+    if not df.index.equals(ROW_ORDER_IDX):
+        df = df.reindex(ROW_ORDER_IDX)
+    # yfinance statements are normally all-float already; only coerce the odd object column
+    non_numeric = df.select_dtypes(exclude="number").columns
+    if len(non_numeric):
+        df[non_numeric] = df[non_numeric].apply(pd.to_numeric, errors="coerce")
     df = df / 1000.0
     return df
 
 
-def get_all_quarters(selected_companies: list) -> list:
+def fetch_all(selected_companies: list) -> dict:
+    """Fetch every selected company's cash flow concurrently, keyed by company name."""
+    jobs = {comp: (fetch_cash_flow, companies[comp]) for comp in selected_companies if comp in companies}
+    return run_concurrently(jobs, max_workers=8, default=pd.DataFrame(index=ROW_ORDER_IDX))
+
+
+def get_all_quarters(data: dict) -> list:
     all_dates = set()
-    for comp in selected_companies:
-        tk = companies.get(comp)
-        if not tk:
-            continue
-        df = fetch_cash_flow(tk)
+    for df in data.values():
         if not df.empty:
             all_dates.update([c for c in df.columns if pd.notna(c)])
     return sorted(all_dates, reverse=True)
@@ -71,44 +64,32 @@ def get_all_years(quarters: list) -> list:
 
 
 # ── BUILD RAW TABLE ───────────────────────────────────────────────────────────
-def build_raw_table(selected_companies: list, mode: str, period) -> pd.DataFrame:
+def build_raw_table(data: dict, selected_companies: list, mode: str, period) -> pd.DataFrame:
     """Pure float DataFrame: index=ROW_ORDER, columns=company names (LBS Bina first)."""
     ordered = [BASE_COMPANY] + [c for c in selected_companies if c != BASE_COMPANY]
 
     result = {}
     for comp in ordered:
-        tk = companies.get(comp)
-        if not tk:
-            result[comp] = pd.Series(float("nan"), index=ROW_ORDER, dtype=float)
-            continue
-        df = fetch_cash_flow(tk)
-        if df.empty:
-            result[comp] = pd.Series(float("nan"), index=ROW_ORDER, dtype=float)
+        df = data.get(comp)
+        if df is None or df.empty:
+            result[comp] = pd.Series(float("nan"), index=ROW_ORDER_IDX, dtype=float)
             continue
 
         if mode == "quarter":
             target = pd.Timestamp(period)
-            col = next((c for c in df.columns if pd.Timestamp(c) == target), None)
-            if col is None:
-                result[comp] = pd.Series(float("nan"), index=ROW_ORDER, dtype=float)
+            if target not in df.columns:
+                result[comp] = pd.Series(float("nan"), index=ROW_ORDER_IDX, dtype=float)
             else:
-                result[comp] = df[col].reindex(ROW_ORDER).astype(float)
+                result[comp] = df[target].astype(float)
         else:  # year — sum quarters (cash flow is a flow, so summing is correct)
-            yr_cols = [c for c in df.columns if pd.Timestamp(c).year == int(period)]
-            if not yr_cols:
-                result[comp] = pd.Series(float("nan"), index=ROW_ORDER, dtype=float)
+            yr_cols = df.columns[df.columns.year == int(period)]
+            if yr_cols.empty:
+                result[comp] = pd.Series(float("nan"), index=ROW_ORDER_IDX, dtype=float)
             else:
-                sub = df[yr_cols]
-                vals = {}
-                for row in ROW_ORDER:
-                    if row not in sub.index:
-                        vals[row] = float("nan")
-                        continue
-                    row_vals = pd.to_numeric(sub.loc[row], errors="coerce").dropna()
-                    vals[row] = float(row_vals.sum()) if not row_vals.empty else float("nan")
-                result[comp] = pd.Series(vals, dtype=float)
+                # min_count=1 keeps rows with no reported quarter as NaN instead of 0
+                result[comp] = df[yr_cols].sum(axis=1, min_count=1).astype(float)
 
-    return pd.DataFrame(result, index=ROW_ORDER).astype(float)
+    return pd.DataFrame(result, index=ROW_ORDER_IDX).astype(float)
 
 
 # ── FORMATTING HELPERS ────────────────────────────────────────────────────────
@@ -173,10 +154,25 @@ def build_display_table(df_raw: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
             elif var_col:
                 col_data[var_col][row] = ""
 
-    display_df = pd.DataFrame(col_data, index=ROW_ORDER)[display_cols]
+    display_df = pd.DataFrame(col_data, index=ROW_ORDER_IDX)[display_cols]
     return display_df, cell_styles
 
 
+# ── CSV EXPORT ────────────────────────────────────────────────────────────────
+def fmt_values(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """Formatted raw values (no variance cols), as written to the CSV export."""
+    return pd.DataFrame(
+        {comp: {row: fmt_value(df_raw.loc[row, comp]) for row in ROW_ORDER}
+         for comp in df_raw.columns},
+        index=ROW_ORDER_IDX,
+    )
+
+
+# ── TABLE STYLES ──────────────────────────────────────────────────────────────
+# Static dark-theme CSS for the comparison table, built once at import
+TABLE_STYLES = statement_table_styles("200px")
+
+
 # ── STREAMLIT PAGE ────────────────────────────────────────────────────────────
 def main():
     st.title("📊 Company Cash Flow – Quarterly")
@@ -213,7 +209,8 @@ def main():
         return
 
     with st.spinner("Loading available periods…"):
-        quarters = get_all_quarters(selected_companies)
+        data     = fetch_all(selected_companies)
+        quarters = get_all_quarters(data)
         years    = get_all_years(quarters)
 
     with col_period:
@@ -243,7 +240,7 @@ def main():
         return
 
     with st.spinner(f"Fetching data for {len(selected_companies)} companies…"):
-        df_raw = build_raw_table(selected_companies, mode, period)
+        df_raw = build_raw_table(data, selected_companies, mode, period)
 
     if df_raw.empty or df_raw.isna().all().all():
         st.warning("No data returned. Try a different period or company selection.")
@@ -264,46 +261,7 @@ def main():
     st.dataframe(
         display_df.style
         .apply(apply_styles, axis=None)
-        .set_table_styles([
-            {
-                "selector": "thead th",
-                "props": [
-                    ("background-color", "#1e1e1e"),
-                    ("color", "white"),
-                    ("font-size", "12px"),
-                    ("white-space", "nowrap"),
-                    ("padding", "8px 10px"),
-                ],
-            },
-            {
-                "selector": "tbody td",
-                "props": [
-                    ("background-color", "#121212"),
-                    ("color", "white"),
-                    ("font-size", "13px"),
-                    ("padding", "6px 10px"),
-                    ("text-align", "right"),
-                    ("font-variant-numeric", "tabular-nums"),
-                ],
-            },
-            {
-                "selector": "tbody tr:hover td",
-                "props": [("background-color", "#1e2d40")],
-            },
-            {
-                "selector": "th.row_heading",
-                "props": [
-                    ("background-color", "#121212"),
-                    ("color", "#d1d5db"),
-                    ("font-size", "12px"),
-                    ("font-weight", "500"),
-                    ("padding", "6px 12px"),
-                    ("white-space", "nowrap"),
-                    ("min-width", "200px"),
-                    ("text-align", "left"),
-                ],
-            },
-        ]),
+        .set_table_styles(TABLE_STYLES),
         use_container_width=True,
         height=min(38 * len(ROW_ORDER) + 40, 600),
     )
@@ -317,12 +275,7 @@ def main():
     )
 
     # ── Download (clean values only, no variance cols) ────────────────────────
-    raw_display = pd.DataFrame(
-        {comp: {row: fmt_value(df_raw.loc[row, comp]) for row in ROW_ORDER}
-         for comp in df_raw.columns},
-        index=ROW_ORDER,
-    )
-    csv = raw_display.to_csv().encode("utf-8")
+    csv = build_csv_bytes(df_raw, fmt_values)
     st.download_button(
         label=f"⬇️ Download CSV — {period_str}",
         data=csv,
@@ -0,0 +1,37 @@
+# concurrent_fetch.py
+# Thread-pool fan-out for the per-ticker Yahoo fetches the pages make.
+# A failed ticker doesn't abort the batch, but it is reported rather than silently left blank.
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import streamlit as st
+
+
+def run_concurrently(jobs: dict, max_workers: int = 8, default=None) -> dict:
+    """Run {key: (fetcher, ticker_code)} on a thread pool; returns {key: result} in job order.
+
+    Jobs that raise get `default` and are listed in one st.warning once the batch is done.
+    A key is either the company name or a tuple starting with it.
+    """
+    if not jobs:
+        return {}
+
+    results = {}
+    failed = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as ex:
+        futures = {ex.submit(fn, tk): key for key, (fn, tk) in jobs.items()}
+        for fut in as_completed(futures):
+            key = futures[fut]
+            try:
+                results[key] = fut.result()
+            except Exception as e:
+                results[key] = default
+                name = key[0] if isinstance(key, tuple) else key
+                failed[f"{name} ({jobs[key][1]})"] = e
+
+    if failed:
+        st.warning(
+            "Couldn't load Yahoo Finance data for "
+            + "; ".join(f"{label}: {err}" for label, err in failed.items())
+            + ". Showing what did load."
+        )
+    return {key: results[key] for key in jobs}
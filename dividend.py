@@ -1,28 +1,20 @@
 # dividend.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 import yfinance as yf
+from yf_session import SESSION
+from file_cache import read_cached, write_cached
+from tickers import BASE_COMPANY as BASE_COMPANY_NAME, COMPANIES
 import plotly.express as px
 from datetime import date
+from concurrent_fetch import run_concurrently
 
-BASE_COMPANY_NAME = "LBS Bina"
-BASE_TICKER = "5789.KL"
-
-COMPETITORS = {
-    "S P Setia": "8664.KL",
-    "Sime Darby Property": "5288.KL",
-    "Eco World": "8206.KL",
-    "UEM Sunrise": "5148.KL",
-    "IOI Properties": "5249.KL",
-    "Mah Sing": "8583.KL",
-    "IJM Corporation": "3336.KL",
-    "Sunway": "5211.KL",
-    "Gamuda": "5398.KL",
-    "OSK Holdings": "5053.KL",
-    "UOA Development": "5200.KL",
-    "Matrix Concepts": "5236.KL",
-    "Lagenda Properties" : "7179.KL",
-}
+BASE_TICKER = COMPANIES[BASE_COMPANY_NAME]
+COMPETITORS = {name: code for name, code in COMPANIES.items() if name != BASE_COMPANY_NAME}
+
+# Dividend history rarely changes intraday; the disk copy is trusted for a day
+DIVIDENDS_DISK_TTL = 24 * 60 * 60
 
 def _ticker_for_company(company: str) -> str | None:
     if company == BASE_COMPANY_NAME:
@@ -35,61 +27,125 @@ def fetch_dividends(ticker: str) -> pd.DataFrame:
     Yahoo Finance dividends via yfinance.
     Returns DataFrame with columns: Date, Dividend
     """
-    t = yf.Ticker(ticker)
+    cached = read_cached(f"{ticker}_dividends", DIVIDENDS_DISK_TTL)
+    if cached is not None:
+        return cached
+
+    t = yf.Ticker(ticker, session=SESSION)
     s = t.dividends  # pandas Series indexed by date
     if s is None or len(s) == 0:
         return pd.DataFrame(columns=["Date", "Dividend"])
 
+    # Keep exchange-local wall time but drop the tz so downstream date maths is plain datetime64;
+    # the index is already a DatetimeIndex, so no to_datetime pass is needed
+    if s.index.tz is not None:
+        s = s.tz_localize(None)
     df = s.reset_index()
     df.columns = ["Date", "Dividend"]
-    df["Date"] = pd.to_datetime(df["Date"])
     df["Dividend"] = pd.to_numeric(df["Dividend"], errors="coerce")
     df = df.dropna(subset=["Dividend"]).sort_values("Date")
+    write_cached(f"{ticker}_dividends", df)
     return df
 
 def build_dividend_dataset(selected_companies: list[str], start_dt: date, end_dt: date) -> pd.DataFrame:
-    rows = []
-    for comp in selected_companies:
-        ticker = _ticker_for_company(comp)
-        if not ticker:
-            continue
+    tickers = {comp: _ticker_for_company(comp) for comp in selected_companies}
+    tickers = {comp: tk for comp, tk in tickers.items() if tk}
 
-        df = fetch_dividends(ticker)
-        if df.empty:
-            continue
+    fetched = run_concurrently({comp: (fetch_dividends, tk) for comp, tk in tickers.items()}, max_workers=8)
 
-        df = df.copy()
-        df["Company"] = comp
-        df["Ticker"] = ticker
-        rows.append(df)
+    # Reassemble in selection order; failed fetches come back as None and are skipped
+    rows = [
+        fetched[comp].assign(Company=comp, Ticker=tk)
+        for comp, tk in tickers.items()
+        if fetched[comp] is not None and not fetched[comp].empty
+    ]
 
     if not rows:
         return pd.DataFrame(columns=["Date", "Dividend", "Company", "Ticker"])
 
     all_df = pd.concat(rows, ignore_index=True)
-    all_df["DateOnly"] = all_df["Date"].dt.date
-    all_df = all_df[(all_df["DateOnly"] >= start_dt) & (all_df["DateOnly"] <= end_dt)].copy()
-    all_df = all_df.drop(columns=["DateOnly"])
+    # Compare in datetime64 against midnight bounds (end inclusive) rather than
+    # materialising Python date objects
+    start_ts = pd.Timestamp(start_dt)
+    end_ts = pd.Timestamp(end_dt) + pd.Timedelta(days=1)
+    all_df = all_df.loc[(all_df["Date"] >= start_ts) & (all_df["Date"] < end_ts)]
+    # Categorical keys so the groupbys and Plotly colour split hash small int codes, not strings
+    all_df = all_df.assign(
+        Company=pd.Categorical(all_df["Company"], categories=selected_companies),
+        Ticker=all_df["Ticker"].astype("category"),
+    )
     all_df = all_df.sort_values(["Company", "Date"])
     return all_df
 
 def annual_dividend_with_growth(df: pd.DataFrame) -> pd.DataFrame:
     """
     Columns: Company, Ticker, Year, AnnualDividend, YoY_Growth (decimal, e.g. 0.12 = 12%)
+
+    Expects df sorted by Company, Date (as build_dividend_dataset returns it), so
+    groups already come out in Company, Year order without another sort.
     """
     if df.empty:
         return pd.DataFrame(columns=["Company", "Ticker", "Year", "AnnualDividend", "YoY_Growth"])
 
     annual = (
-        df.assign(Year=df["Date"].dt.year)
-          .groupby(["Company", "Ticker", "Year"], as_index=False)["Dividend"]
-          .sum()
-          .rename(columns={"Dividend": "AnnualDividend"})
-          .sort_values(["Company", "Year"])
+        df.assign(Year=df["Date"].to_numpy().astype("datetime64[Y]").astype("int32") + 1970)
+          .groupby(["Company", "Ticker", "Year"], as_index=False, observed=True, sort=False)
+          .agg(AnnualDividend=("Dividend", "sum"))
     )
-    annual["YoY_Growth"] = annual.groupby("Company")["AnnualDividend"].pct_change()
+    # Rows are in Company, Year order, so YoY is just a shifted divide masked at company boundaries
+    comp = annual["Company"].to_numpy()
+    val = annual["AnnualDividend"].to_numpy(dtype=float)
+    prev_val = np.empty_like(val)
+    prev_val[0] = np.nan
+    prev_val[1:] = val[:-1]
+    same = np.empty(len(val), dtype=bool)
+    same[0] = False
+    same[1:] = comp[1:] == comp[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annual["YoY_Growth"] = np.where(same, val / prev_val - 1.0, np.nan)
     return annual
 
+@st.cache_data(show_spinner=False)
+def build_timeline_figure(df: pd.DataFrame, start_dt: date, end_dt: date):
+    """Dividend events scatter; cached so reruns on the same data skip the Plotly build."""
+    fig = px.scatter(
+        df,
+        x="Date",
+        y="Dividend",
+        color="Company",
+        title=f"Dividend Events ({start_dt} → {end_dt})",
+    )
+    fig.update_traces(marker=dict(size=10), mode="markers")
+    fig.update_layout(xaxis_title="Date", yaxis_title="Dividend (per share)")
+    return fig
+
+@st.cache_data(show_spinner=False)
+def build_annual_figure(annual: pd.DataFrame):
+    """Annual dividend lines with YoY growth in the hover."""
+    ann_fig = px.line(
+        annual,
+        x="Year",
+        y="AnnualDividend",
+        color="Company",
+        markers=True,
+        title="Annual Dividend per Share",
+        custom_data=["YoY_Growth"],
+    )
+
+    # Custom hover: show YoY% nicely, handle N/A (first year)
+    ann_fig.update_traces(
+        hovertemplate=(
+            "<b>%{fullData.name}</b><br>"
+            "Year: %{x}<br>"
+            "Annual Dividend: %{y:.4f}<br>"
+            "YoY Growth: %{customdata[0]:+.1%}<br>"
+            "<extra></extra>"
+        )
+    )
+
+    ann_fig.update_layout(xaxis_title="Year", yaxis_title="Annual Dividend (per share)")
+    return ann_fig
+
 def main():
     st.title("💸 Dividend Dashboard")
 
@@ -122,7 +178,7 @@ def main():
         # --- Summary totals ---
         st.subheader("📌 Total Dividends in Period")
         totals = (
-            df.groupby("Company", as_index=False)["Dividend"]
+            df.groupby("Company", as_index=False, observed=True, sort=False)["Dividend"]
               .sum()
               .rename(columns={"Dividend": "Total Dividend"})
               .sort_values("Total Dividend", ascending=False)
@@ -131,53 +187,24 @@ def main():
 
         # --- Timeline chart ---
         st.subheader("📈 Dividend Payout Timeline")
-        fig = px.scatter(
-            df,
-            x="Date",
-            y="Dividend",
-            color="Company",
-            title=f"Dividend Events ({start_dt} → {end_dt})",
-        )
-        fig.update_traces(marker=dict(size=10), mode="markers")
-        fig.update_layout(xaxis_title="Date", yaxis_title="Dividend (per share)")
+        fig = build_timeline_figure(df, start_dt, end_dt)
         st.plotly_chart(fig, use_container_width=True)
 
         # --- Annual dividends line chart with YoY growth in hover ---
         annual = annual_dividend_with_growth(df)
 
         st.subheader("📊 Annual Dividends (YoY Growth in Hover)")
-        ann_fig = px.line(
-            annual,
-            x="Year",
-            y="AnnualDividend",
-            color="Company",
-            markers=True,
-            title="Annual Dividend per Share",
-            custom_data=["YoY_Growth"],
-        )
-
-        # Custom hover: show YoY% nicely, handle N/A (first year)
-        ann_fig.update_traces(
-            hovertemplate=(
-                "<b>%{fullData.name}</b><br>"
-                "Year: %{x}<br>"
-                "Annual Dividend: %{y:.4f}<br>"
-                "YoY Growth: %{customdata[0]:+.1%}<br>"
-                "<extra></extra>"
-            )
-        )
-
-        ann_fig.update_layout(xaxis_title="Year", yaxis_title="Annual Dividend (per share)")
+        ann_fig = build_annual_figure(annual)
         st.plotly_chart(ann_fig, use_container_width=True)
 
         st.caption("Tip: First year per company will show YoY as blank/NaN since there’s no prior year to compare.")
 
         # --- Table of events ---
         st.subheader("🧾 Dividend Event Table")
-        table_df = df.copy()
-        table_df["Date"] = table_df["Date"].dt.date
+        # Date stays datetime64 (sorts natively in the grid); the Styler only formats how it's shown
         st.dataframe(
-            table_df.rename(columns={"Dividend": "Dividend (per share)"}).style.format({"Dividend (per share)": "{:.4f}"}),
+            df.rename(columns={"Dividend": "Dividend (per share)"})
+              .style.format({"Date": "{:%Y-%m-%d}", "Dividend (per share)": "{:.4f}"}),
             use_container_width=True,
         )
 
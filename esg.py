@@ -1,37 +1,33 @@
 # esg.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
+from tickers import COMPANIES
 
 # -----------------------
 # CONFIG
 # -----------------------
 CSV_PATH = "ftse_esg_selected_companies_3y.csv"
+# Only these columns are used; parse them straight into their final dtypes
+CSV_COLUMNS = ["Year", "StockCode", "Company", "ESG_Stars"]
+CSV_DTYPES = {"Year": "int64", "StockCode": "str", "Company": "str"}
 
-NAME_TO_CODE = {
-    "LBS Bina": "5789",
-    "S P Setia": "8664",
-    "Sime Darby Property": "5288",
-    "Eco World": "8206",
-    "UEM Sunrise": "5148",
-    "IOI Properties": "5249",
-    "Mah Sing": "8583",
-    "IJM Corporation": "3336",
-    "Sunway": "5211",
-    "Gamuda": "5398",
-    "OSK Holdings": "5053",
-    "UOA Development": "5200",
-}
+# Bursa stock codes are the Yahoo tickers without the ".KL" suffix
+NAME_TO_CODE = {name: code.removesuffix(".KL") for name, code in COMPANIES.items()}
 
 CODE_TO_NAME = {v: k for k, v in NAME_TO_CODE.items()}
 
 @st.cache_data(show_spinner=False)
 def load_esg_table() -> pd.DataFrame:
-    df = pd.read_csv(CSV_PATH)
+    df = pd.read_csv(
+        CSV_PATH,
+        usecols=lambda c: c in CSV_COLUMNS,
+        dtype=CSV_DTYPES,
+    )
 
-    # Normalize types
-    df["Year"] = df["Year"].astype(int)
-    df["StockCode"] = df["StockCode"].astype(str).str.zfill(4)
+    # StockCode is read as text, so only the zero-padding is left to normalize
+    df["StockCode"] = df["StockCode"].str.zfill(4)
     df["ESG_Stars"] = pd.to_numeric(df["ESG_Stars"], errors="coerce")
 
     # Ensure Company exists (if your extractor already has Company, keep it)
@@ -40,14 +36,16 @@ def load_esg_table() -> pd.DataFrame:
 
     # Add a clean display label
     df["Label"] = df["Company"] + " (" + df["StockCode"] + ")"
-    return df
+
+    # Few distinct companies, many rows: group/pivot on integer codes rather than strings
+    return df.astype({"StockCode": "category", "Company": "category"})
 
 def compute_3y_change(df: pd.DataFrame) -> pd.DataFrame:
     """
     Returns per StockCode:
       ESG_2023, ESG_2024, ESG_2025 (if present), Change_3Y
     """
-    wide = df.pivot_table(index=["StockCode", "Company"], columns="Year", values="ESG_Stars", aggfunc="max")
+    wide = df.pivot_table(index=["StockCode", "Company"], columns="Year", values="ESG_Stars", aggfunc="max", observed=True)
     wide = wide.reset_index()
 
     years = sorted([c for c in wide.columns if isinstance(c, int)])
@@ -64,6 +62,37 @@ def compute_3y_change(df: pd.DataFrame) -> pd.DataFrame:
     wide["Change_3Y"] = wide["ESG_Last"] - wide["ESG_First"]
     return wide
 
+@st.cache_data(show_spinner=False)
+def selection_summary(selected: tuple) -> tuple:
+    """
+    Returns (latest_year, latest-year ranking, prev→latest YoY frame) for the selected labels.
+    Cached on the selection so reruns from unrelated widgets skip the filter/groupby/pivot.
+    """
+    df = load_esg_table()
+    dsel = df[df["Label"].isin(selected)]
+
+    latest_year = dsel["Year"].max()
+    prev_year = latest_year - 1
+
+    latest_df = (
+        dsel[dsel["Year"] == latest_year]
+        .groupby("Label", as_index=False)["ESG_Stars"]
+        .max()
+        .sort_values("ESG_Stars", ascending=False)
+    )
+
+    # One pivot gives both years side by side; companies missing either year drop out
+    yoy = (
+        dsel[dsel["Year"].isin([prev_year, latest_year])]
+        .pivot_table(index=["StockCode", "Company"], columns="Year", values="ESG_Stars", aggfunc="max", observed=True)
+        .reindex(columns=[prev_year, latest_year])
+        .dropna()
+        .set_axis(["ESG_Previous", "ESG_Latest"], axis=1)
+        .reset_index()
+    )
+    yoy["YoY_Change"] = yoy["ESG_Latest"] - yoy["ESG_Previous"]
+    return latest_year, latest_df, yoy
+
 def main():
     st.title("🌿 ESG Comparison (FTSE Russell via Bursa PDFs)")
 
@@ -86,24 +115,16 @@ def main():
         st.warning("Select at least one developer.")
         return
 
-    dsel = df[df["Label"].isin(selected)].copy()
+    latest_year, latest_df, yoy = selection_summary(tuple(selected))
+    prev_year = latest_year - 1
 
     st.divider()
 
     # -----------------------
     # 1) BAR CHART – LATEST YEAR ONLY (DESC ORDER)
     # -----------------------
-    latest_year = dsel["Year"].max()
-
     st.subheader(f"📊 ESG Stars ({latest_year}) – Highest to Lowest")
 
-    latest_df = (
-        dsel[dsel["Year"] == latest_year]
-        .groupby("Label", as_index=False)["ESG_Stars"]
-        .max()
-        .sort_values("ESG_Stars", ascending=False)
-    )
-
     bar_fig = px.bar(
         latest_df,
         x="Label",
@@ -125,28 +146,11 @@ def main():
     # -----------------------
     st.subheader("🔁 ESG Stars YoY Movement")
 
-    prev_year = latest_year - 1
-
-    latest = dsel[dsel["Year"] == latest_year][
-        ["StockCode", "Company", "ESG_Stars"]
-    ].rename(columns={"ESG_Stars": "ESG_Latest"})
-
-    prev = dsel[dsel["Year"] == prev_year][
-        ["StockCode", "ESG_Stars"]
-    ].rename(columns={"ESG_Stars": "ESG_Previous"})
-
-    yoy = latest.merge(prev, on="StockCode", how="inner")
-    yoy["YoY_Change"] = yoy["ESG_Latest"] - yoy["ESG_Previous"]
-
-    increased = yoy[yoy["YoY_Change"] > 0][
-        ["Company", "ESG_Previous", "ESG_Latest", "YoY_Change"]
-    ]
-    constant = yoy[yoy["YoY_Change"] == 0][
-        ["Company", "ESG_Previous", "ESG_Latest", "YoY_Change"]
-    ]
-    decreased = yoy[yoy["YoY_Change"] < 0][
-        ["Company", "ESG_Previous", "ESG_Latest", "YoY_Change"]
-    ]
+    yoy_cols = ["Company", "ESG_Previous", "ESG_Latest", "YoY_Change"]
+    direction = np.sign(yoy["YoY_Change"].to_numpy())
+    increased = yoy.loc[direction > 0, yoy_cols]
+    constant = yoy.loc[direction == 0, yoy_cols]
+    decreased = yoy.loc[direction < 0, yoy_cols]
 
     c1, c2, c3 = st.columns(3)
 
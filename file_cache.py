@@ -0,0 +1,106 @@
+# file_cache.py
+# Parquet-on-disk cache for Yahoo fetches, so restarts/redeploys don't refetch history.
+# st.cache_data(persist="disk") ignores ttl, hence this small TTL-checked store.
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def _params_hash(params: dict | None) -> str:
+    return hashlib.md5(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _paths(name: str) -> tuple[str, str]:
+    base = os.path.join(CACHE_DIR, name)
+    return base + ".parquet", base + ".meta.json"
+
+
+def read_cached(name: str, ttl: float, params: dict | None = None) -> pd.DataFrame | None:
+    """Cached frame for name if it was written with the same params less than ttl seconds ago."""
+    data_path, meta_path = _paths(name)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("params") != _params_hash(params):
+            return None
+        if time.time() - meta.get("fetched_at", 0) > ttl:
+            return None
+        return pd.read_parquet(data_path)
+    except Exception:
+        # Missing or unreadable entry is just a miss
+        return None
+
+
+def write_cached(name: str, df: pd.DataFrame, params: dict | None = None) -> None:
+    """Best-effort write; a read-only or full disk never breaks the page."""
+    data_path, meta_path = _paths(name)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_parquet(data_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": time.time(), "params": _params_hash(params)}, f)
+    except Exception:
+        pass
+
+
+def read_cached_range(name: str, ttl: float, start, end) -> pd.DataFrame | None:
+    """Date-indexed cached frame for name, sliced to [start, end] if the stored window covers it."""
+    data_path, meta_path = _paths(name)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if time.time() - meta.get("fetched_at", 0) > ttl:
+            return None
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if not (pd.Timestamp(meta["start"]) <= start and end <= pd.Timestamp(meta["end"])):
+            return None
+        df = pd.read_parquet(data_path)
+        return df.loc[start:end]
+    except Exception:
+        # Missing, unreadable or keyed (non-range) entry is just a miss
+        return None
+
+
+def write_cached_range(name: str, df: pd.DataFrame, start, end, ttl: float) -> None:
+    """Best-effort write of a date-indexed frame along with the [start, end] window it was fetched for.
+
+    A fresh stored window that overlaps or touches [start, end] is merged rather than replaced,
+    so a narrow fetch never evicts a wider cached history; the merged entry keeps the older
+    fetched_at so it still expires with its oldest rows.
+    """
+    data_path, meta_path = _paths(name)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    fetched_at = time.time()
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        old_start, old_end = pd.Timestamp(meta["start"]), pd.Timestamp(meta["end"])
+        one_day = pd.Timedelta(days=1)
+        if (fetched_at - meta.get("fetched_at", 0) <= ttl
+                and start <= old_end + one_day and old_start - one_day <= end):
+            if old_start <= start and end <= old_end:
+                # Already covered by the stored window
+                return
+            df = df.combine_first(pd.read_parquet(data_path))
+            start, end = min(start, old_start), max(end, old_end)
+            fetched_at = meta["fetched_at"]
+    except Exception:
+        # Missing, stale-format or unreadable entry: just overwrite it
+        pass
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_parquet(data_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "fetched_at": fetched_at,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+            }, f)
+    except Exception:
+        pass
@@ -1,30 +1,17 @@
 # pages/financials.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 import yfinance as yf
+from tickers import BASE_COMPANY, COMPANIES as companies
+from yf_session import SESSION
+from file_cache import read_cached, write_cached
+from concurrent_fetch import run_concurrently
+from statement_table import build_csv_bytes, statement_table_styles
 
 # -------------------------
 # CONFIG
 # -------------------------
-BASE_COMPANY = "LBS Bina"
-
-companies = {
-    "LBS Bina": "5789.KL",
-    "S P Setia": "8664.KL",
-    "Sime Darby Property": "5288.KL",
-    "Eco World": "8206.KL",
-    "UEM Sunrise": "5148.KL",
-    "IOI Properties": "5249.KL",
-    "Mah Sing": "8583.KL",
-    "IJM Corporation": "3336.KL",
-    "Sunway": "5211.KL",
-    "Gamuda": "5398.KL",
-    "OSK Holdings": "5053.KL",
-    "UOA Development": "5200.KL",
-    "Matrix Concepts": "5236.KL",
-    "Lagenda Properties": "7179.KL",
-}
-
 ROW_ORDER = [
     "Total Revenue",
     "Cost Of Revenue",
@@ -59,39 +46,65 @@ ROW_ORDER = [
     "Tax Rate For Calcs",
     "Tax Effect Of Unusual Items",
 ]
+ROW_ORDER_IDX = pd.Index(ROW_ORDER)
 
 ROW_REVENUE = "Total Revenue"
 ROW_PATMI   = "Net Income From Continuing Operation Net Minority Interest"
 
 ROWS_UNSCALED = {"Basic EPS", "Diluted EPS", "Tax Rate For Calcs"}
 
+# Quarterly statements only move on results day; the disk copy is trusted for a day
+FINANCIALS_DISK_TTL = 24 * 60 * 60
+
+# Row mask over ROW_ORDER for the rows scaled to RM thousands
+SCALE_MASK = np.array([r not in ROWS_UNSCALED for r in ROW_ORDER])
+
+# Row classes for display formatting, as masks over ROW_ORDER
+EPS_MASK   = np.array([r in ("Basic EPS", "Diluted EPS") for r in ROW_ORDER])
+RATE_MASK  = np.array([r == "Tax Rate For Calcs" for r in ROW_ORDER])
+MONEY_MASK = ~(EPS_MASK | RATE_MASK)
+
 # -------------------------
 # DATA FETCHING
 # -------------------------
 @st.cache_data(ttl=3600, show_spinner=False)
 def fetch_quarterly_financials(ticker_code: str) -> pd.DataFrame:
-    t = yf.Ticker(ticker_code)
+    # Parquet needs string column names, so the disk copy is stored quarters-as-rows
+    cached = read_cached(f"{ticker_code}_financials", FINANCIALS_DISK_TTL)
+    if cached is not None:
+        return cached.T
+
+    t = yf.Ticker(ticker_code, session=SESSION)
     df = t.quarterly_financials
     if df is None or df.empty:
-        return pd.DataFrame(index=ROW_ORDER)
-    try:
-        df.columns = pd.to_datetime(df.columns)
-    except Exception:
-        df.columns = pd.to_datetime([str(c) for c in df.columns], errors="coerce")
-    df = df.reindex(ROW_ORDER)
-    df = df.apply(pd.to_numeric, errors="coerce")
-    scale_rows = [r for r in df.index if r not in ROWS_UNSCALED]
-    df.loc[scale_rows] = df.loc[scale_rows] / 1000.0
+        return pd.DataFrame(index=ROW_ORDER_IDX)
+    if not isinstance(df.columns, pd.DatetimeIndex):
+        try:
+            df.columns = pd.to_datetime(df.columns)
+        except Exception:
+            df.columns = pd.to_datetime([str(c) for c in df.columns], errors="coerce")
+    if not df.index.equals(ROW_ORDER_IDX):
+        df = df.reindex(ROW_ORDER_IDX)
+    # yfinance statements are normally all-float already; only coerce the odd object column
+    non_numeric = df.select_dtypes(exclude="number").columns
+    if len(non_numeric):
+        df[non_numeric] = df[non_numeric].apply(pd.to_numeric, errors="coerce")
+    values = df.to_numpy(dtype=float, copy=True)
+    values[SCALE_MASK] /= 1000.0
+    df = pd.DataFrame(values, index=df.index, columns=df.columns)
+    write_cached(f"{ticker_code}_financials", df.T)
     return df
 
 
-def get_all_quarters(selected_companies: list) -> list:
+def fetch_all(selected_companies: list) -> dict:
+    """Fetch every selected company's financials concurrently, keyed by company name."""
+    jobs = {comp: (fetch_quarterly_financials, companies[comp]) for comp in selected_companies if comp in companies}
+    return run_concurrently(jobs, max_workers=12, default=pd.DataFrame(index=ROW_ORDER_IDX))
+
+
+def get_all_quarters(data: dict) -> list:
     all_dates = set()
-    for comp in selected_companies:
-        ticker = companies.get(comp)
-        if not ticker:
-            continue
-        df = fetch_quarterly_financials(ticker)
+    for df in data.values():
         if not df.empty:
             all_dates.update([c for c in df.columns if pd.notna(c)])
     return sorted(all_dates, reverse=True)
@@ -104,70 +117,54 @@ def get_all_years(quarters: list) -> list:
 # -------------------------
 # BUILD RAW TABLE
 # -------------------------
-def build_comparison_table(selected_companies: list, mode: str, period) -> pd.DataFrame:
+def build_comparison_table(data: dict, selected_companies: list, mode: str, period) -> pd.DataFrame:
     # Always put LBS Bina first
     ordered = [BASE_COMPANY] + [c for c in selected_companies if c != BASE_COMPANY]
 
     result = {}
     for comp in ordered:
-        ticker = companies.get(comp)
-        if not ticker:
-            result[comp] = pd.Series(float("nan"), index=ROW_ORDER, dtype=float)
-            continue
-
-        df = fetch_quarterly_financials(ticker)
-        if df.empty:
-            result[comp] = pd.Series(float("nan"), index=ROW_ORDER, dtype=float)
+        df = data.get(comp)
+        if df is None or df.empty:
+            result[comp] = pd.Series(float("nan"), index=ROW_ORDER_IDX, dtype=float)
             continue
 
         if mode == "quarter":
             target = pd.Timestamp(period)
-            col = next((c for c in df.columns if pd.Timestamp(c) == target), None)
-            if col is None:
-                result[comp] = pd.Series(float("nan"), index=ROW_ORDER, dtype=float)
+            if target not in df.columns:
+                result[comp] = pd.Series(float("nan"), index=ROW_ORDER_IDX, dtype=float)
             else:
-                result[comp] = df[col].reindex(ROW_ORDER).astype(float)
+                result[comp] = df[target].astype(float)
 
         else:  # year — sum money rows, average unscaled rows
-            yr_cols = [c for c in df.columns if pd.Timestamp(c).year == int(period)]
-            if not yr_cols:
-                result[comp] = pd.Series(float("nan"), index=ROW_ORDER, dtype=float)
+            yr_cols = df.columns[df.columns.year == int(period)]
+            if yr_cols.empty:
+                result[comp] = pd.Series(float("nan"), index=ROW_ORDER_IDX, dtype=float)
             else:
                 sub = df[yr_cols]
-                vals = {}
-                for row in ROW_ORDER:
-                    if row not in sub.index:
-                        vals[row] = float("nan")
-                        continue
-                    row_vals = pd.to_numeric(sub.loc[row], errors="coerce").dropna()
-                    if row_vals.empty:
-                        vals[row] = float("nan")
-                    elif row in ROWS_UNSCALED:
-                        vals[row] = float(row_vals.mean())
-                    else:
-                        vals[row] = float(row_vals.sum())
-                result[comp] = pd.Series(vals, dtype=float)
-
-    return pd.DataFrame(result, index=ROW_ORDER).astype(float)
+                # min_count=1 keeps rows with no reported quarter as NaN instead of 0
+                result[comp] = sub.sum(axis=1, min_count=1).where(SCALE_MASK, sub.mean(axis=1))
+
+    return pd.DataFrame(result, index=ROW_ORDER_IDX).astype(float)
 
 
 # -------------------------
 # FORMATTING HELPERS
 # -------------------------
-def fmt_cell(row_name: str, val) -> str:
-    try:
-        v = float(val)
-    except Exception:
-        return "--"
-    if pd.isna(v) or v == 0:
-        return "--"
-    if row_name in ("Basic EPS", "Diluted EPS"):
-        return f"{v:.2f}"
-    if row_name == "Tax Rate For Calcs":
-        return f"{v:.6f}".rstrip("0").rstrip(".")
-    if v < 0:
-        return f"({abs(v):,.0f})"
-    return f"{v:,.0f}"
+def fmt_values(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """Format the whole ROW_ORDER x company table at once, one row class at a time."""
+    vals = df_raw.to_numpy(dtype=float)
+    out  = np.full(vals.shape, "--", dtype=object)
+    ok   = ~np.isnan(vals) & (vals != 0)
+
+    eps  = ok & EPS_MASK[:, None]
+    rate = ok & RATE_MASK[:, None]
+    pos  = ok & MONEY_MASK[:, None] & (vals > 0)
+    neg  = ok & MONEY_MASK[:, None] & (vals < 0)
+    out[eps]  = [f"{v:.2f}" for v in vals[eps]]
+    out[rate] = [f"{v:.6f}".rstrip("0").rstrip(".") for v in vals[rate]]
+    out[pos]  = [f"{v:,.0f}" for v in vals[pos]]
+    out[neg]  = [f"({v:,.0f})" for v in -vals[neg]]
+    return pd.DataFrame(out, index=df_raw.index, columns=df_raw.columns)
 
 
 def fmt_variance(diff: float, pct: float) -> str:
@@ -180,96 +177,102 @@ def fmt_variance(diff: float, pct: float) -> str:
 # -------------------------
 # BUILD DISPLAY TABLE WITH VARIANCE
 # -------------------------
-def build_display_table(df_raw: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+def build_display_table(df_raw: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     Returns:
       display_df  — string DataFrame; each peer company gets a value col +
                     a 'vs LBS Bina' variance col inserted right after it.
-      cell_styles — dict (row, col) → css string for variance colouring.
+      styles_df   — same shape as display_df; css string per cell for
+                    variance colouring ("" elsewhere), ready for Styler.apply.
     """
     base_col = BASE_COMPANY
     has_base = base_col in df_raw.columns
 
     display_cols = []
     col_data     = {}
-    cell_styles  = {}
-
-    for comp in df_raw.columns:
-        val_col = comp
-        var_col = f"{comp} vs LBS Bina" if comp != base_col else None
-
-        display_cols.append(val_col)
-        col_data[val_col] = {}
-
-        if var_col:
+    style_data   = {}
+
+    values   = fmt_values(df_raw)
+    var_strs = np.full(df_raw.shape, "", dtype=object)
+    var_css  = np.full(df_raw.shape, "", dtype=object)
+
+    if has_base:
+        # Variance for every cell at once; pct is NaN wherever the base is
+        # missing or zero, and unscaled rows never show a variance
+        vals = df_raw.to_numpy(dtype=float)
+        base = df_raw[base_col].to_numpy(dtype=float)[:, None]
+        diff = vals - base
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(base != 0, diff / np.abs(base) * 100, np.nan)
+        peer = np.asarray(df_raw.columns != base_col)
+        show = SCALE_MASK[:, None] & peer & ~np.isnan(pct)
+        var_strs[show] = [fmt_variance(d, p) for d, p in zip(diff[show], pct[show])]
+        var_css[show]  = np.where(diff[show] >= 0,
+                                  "color:#16a34a;font-size:11px;",
+                                  "color:#dc2626;font-size:11px;")
+
+    for i, comp in enumerate(df_raw.columns):
+        display_cols.append(comp)
+        col_data[comp] = values[comp]
+        style_data[comp] = ""
+
+        if comp != base_col:
+            var_col = f"{comp} vs LBS Bina"
             display_cols.append(var_col)
-            col_data[var_col] = {}
-
-        for row in ROW_ORDER:
-            raw_val = df_raw.loc[row, comp]
-            val_str = fmt_cell(row, raw_val)
-            col_data[val_col][row] = val_str
-
-            if var_col and has_base and row not in ROWS_UNSCALED:
-                base_val = df_raw.loc[row, base_col]
-                try:
-                    v    = float(raw_val)
-                    b    = float(base_val)
-                    diff = v - b
-                    pct  = (diff / abs(b) * 100) if b != 0 else float("nan")
-                    var_str = fmt_variance(diff, pct)
-                    col_data[var_col][row] = var_str
-                    if not pd.isna(diff) and var_str:
-                        colour = "#16a34a" if diff >= 0 else "#dc2626"
-                        cell_styles[(row, var_col)] = f"color:{colour};font-size:11px;"
-                except Exception:
-                    col_data[var_col][row] = ""
-            elif var_col:
-                col_data[var_col][row] = ""
-
-    display_df = pd.DataFrame(col_data, index=ROW_ORDER)[display_cols]
-    return display_df, cell_styles
+            col_data[var_col] = var_strs[:, i]
+            style_data[var_col] = var_css[:, i]
+
+    display_df = pd.DataFrame(col_data, index=ROW_ORDER_IDX)[display_cols]
+    styles_df  = pd.DataFrame(style_data, index=ROW_ORDER_IDX)[display_cols]
+    return display_df, styles_df
 
 
 # -------------------------
 # METRICS HELPERS (used by other pages)
 # -------------------------
-def get_revenue_data(company_list, start=None, end=None) -> pd.DataFrame:
-    records = []
+def get_metric_sums(company_list, metrics: dict, start=None, end=None) -> pd.DataFrame:
+    """
+    Sum several statement rows per company over [start, end] in one pass.
+    metrics maps output column → ROW_ORDER label, e.g. {"Revenue": ROW_REVENUE}.
+    """
+    names = []
+    sums  = {name: [] for name in metrics}
     start = pd.to_datetime(start) if start is not None else None
     end   = pd.to_datetime(end)   if end   is not None else None
+    data  = fetch_all(company_list)
     for comp in company_list:
-        ticker = companies.get(comp)
-        if not ticker:
-            records.append({"Company": comp, "Revenue": 0.0}); continue
-        df = fetch_quarterly_financials(ticker)
-        if df.empty or ROW_REVENUE not in df.index:
-            records.append({"Company": comp, "Revenue": 0.0}); continue
-        row = pd.to_numeric(df.loc[ROW_REVENUE], errors="coerce")
-        row.index = pd.to_datetime(row.index, errors="coerce")
+        names.append(comp)
+        df = data.get(comp)
+        if df is None or df.empty:
+            for col in sums.values():
+                col.append(0.0)
+            continue
+        # Columns are already a DatetimeIndex from fetch_quarterly_financials
         if start is not None and end is not None:
-            row = row.loc[(row.index >= start) & (row.index <= end)]
-        records.append({"Company": comp, "Revenue": float(row.dropna().sum()) if not row.dropna().empty else 0.0})
-    return pd.DataFrame(records)
+            df = df.loc[:, (df.columns >= start) & (df.columns <= end)]
+        for name, row_label in metrics.items():
+            if row_label not in df.index:
+                sums[name].append(0.0)
+                continue
+            # fetch_quarterly_financials is all-float; nansum gives 0.0 for no data
+            sums[name].append(float(np.nansum(df.loc[row_label].to_numpy(dtype=float))))
+    return pd.DataFrame({"Company": names,
+                         **{name: np.asarray(col, dtype=np.float64) for name, col in sums.items()}})
+
+
+def get_revenue_data(company_list, start=None, end=None) -> pd.DataFrame:
+    return get_metric_sums(company_list, {"Revenue": ROW_REVENUE}, start, end)
 
 
 def get_patmi_data(company_list, start=None, end=None) -> pd.DataFrame:
-    records = []
-    start = pd.to_datetime(start) if start is not None else None
-    end   = pd.to_datetime(end)   if end   is not None else None
-    for comp in company_list:
-        ticker = companies.get(comp)
-        if not ticker:
-            records.append({"Company": comp, "PATMI": 0.0}); continue
-        df = fetch_quarterly_financials(ticker)
-        if df.empty or ROW_PATMI not in df.index:
-            records.append({"Company": comp, "PATMI": 0.0}); continue
-        row = pd.to_numeric(df.loc[ROW_PATMI], errors="coerce")
-        row.index = pd.to_datetime(row.index, errors="coerce")
-        if start is not None and end is not None:
-            row = row.loc[(row.index >= start) & (row.index <= end)]
-        records.append({"Company": comp, "PATMI": float(row.dropna().sum()) if not row.dropna().empty else 0.0})
-    return pd.DataFrame(records)
+    return get_metric_sums(company_list, {"PATMI": ROW_PATMI}, start, end)
+
+
+# -------------------------
+# TABLE STYLES
+# -------------------------
+# Static dark-theme CSS for the comparison table, built once at import
+TABLE_STYLES = statement_table_styles("260px")
 
 
 # -------------------------
@@ -310,7 +313,8 @@ def main():
         return
 
     with st.spinner("Loading available periods…"):
-        quarters = get_all_quarters(selected_companies)
+        data     = fetch_all(selected_companies)
+        quarters = get_all_quarters(data)
         years    = get_all_years(quarters)
 
     with col_period:
@@ -340,66 +344,20 @@ def main():
         return
 
     with st.spinner(f"Fetching data for {len(selected_companies)} companies…"):
-        df_raw = build_comparison_table(selected_companies, mode, period)
+        df_raw = build_comparison_table(data, selected_companies, mode, period)
 
     if df_raw.empty or df_raw.isna().all().all():
         st.warning("No data returned. Try a different period or company selection.")
         return
 
-    display_df, cell_styles = build_display_table(df_raw)
+    display_df, styles_df = build_display_table(df_raw)
 
     # ── Render ────────────────────────────────────────────────────────────────
     st.subheader(f"📄 Financial Comparison — {period_str}")
 
-    def apply_styles(df):
-        styles = pd.DataFrame("", index=df.index, columns=df.columns)
-        for (row, col), css in cell_styles.items():
-            if row in styles.index and col in styles.columns:
-                styles.loc[row, col] = css
-        return styles
-
     var_cols = [c for c in display_df.columns if "vs LBS Bina" in c]
 
-    table_styles = [
-        {
-            "selector": "thead th",
-            "props": [
-                ("background-color", "#1e1e1e"),
-                ("color", "white"),
-                ("font-size", "12px"),
-                ("white-space", "nowrap"),
-                ("padding", "8px 10px"),
-            ],
-        },
-        {
-            "selector": "tbody td",
-            "props": [
-                ("background-color", "#121212"),
-                ("color", "white"),
-                ("font-size", "13px"),
-                ("padding", "6px 10px"),
-                ("text-align", "right"),
-                ("font-variant-numeric", "tabular-nums"),
-            ],
-        },
-        {
-            "selector": "tbody tr:hover td",
-            "props": [("background-color", "#1e2d40")],
-        },
-        {
-            "selector": "th.row_heading",
-            "props": [
-                ("background-color", "#121212"),
-                ("color", "#d1d5db"),
-                ("font-size", "12px"),
-                ("font-weight", "500"),
-                ("padding", "6px 12px"),
-                ("white-space", "nowrap"),
-                ("min-width", "260px"),
-                ("text-align", "left"),
-            ],
-        },
-    ]
+    table_styles = list(TABLE_STYLES)
 
     # Dim variance column headers
     for vc in var_cols:
@@ -410,7 +368,7 @@ def main():
 
     styler = (
         display_df.style
-        .apply(apply_styles, axis=None)
+        .apply(lambda _: styles_df, axis=None)
         .set_table_styles(table_styles)
     )
 
@@ -430,12 +388,7 @@ def main():
     )
 
     # ── Download (raw values only, no variance cols) ──────────────────────────
-    raw_display = pd.DataFrame(
-        {comp: {row: fmt_cell(row, df_raw.loc[row, comp]) for row in ROW_ORDER}
-         for comp in df_raw.columns},
-        index=ROW_ORDER,
-    )
-    csv = raw_display.to_csv().encode("utf-8")
+    csv = build_csv_bytes(df_raw, fmt_values)
     st.download_button(
         label=f"⬇️ Download CSV — {period_str}",
         data=csv,
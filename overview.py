@@ -1,35 +1,24 @@
 # overview.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 import yfinance as yf
 from datetime import date
 import plotly.express as px
+from yf_session import SESSION
+from file_cache import read_cached_range, write_cached_range
+from downsample import lttb_indices
+from tickers import BASE_COMPANY, COMPANIES as ALL_COMPANIES
 
 # ─────────────────────────────────────────────────────────────
 # CONFIG
 # ─────────────────────────────────────────────────────────────
 st.set_page_config(page_title="Overview – Competitor Monitoring", layout="wide")
 
-BASE_COMPANY = "LBS Bina"
-BASE_TICKER = "5789.KL"
-
-COMPETITORS = {
-    "S P Setia": "8664.KL",
-    "Sime Darby Property": "5288.KL",
-    "Eco World": "8206.KL",
-    "UEM Sunrise": "5148.KL",
-    "IOI Properties": "5249.KL",
-    "Mah Sing": "8583.KL",
-    "IJM Corporation": "3336.KL",
-    "Sunway": "5211.KL",
-    "Gamuda": "5398.KL",
-    "OSK Holdings": "5053.KL",
-    "UOA Development": "5200.KL",
-    "Matrix Concepts": "5236.KL",
-    "Lagenda Properties" : "7179.KL",
-}
-
-ALL_COMPANIES = {BASE_COMPANY: BASE_TICKER, **COMPETITORS}
+CLOSE_DISK_TTL = 60 * 30
+
+# Points per company line on the chart; longer series are LTTB-downsampled
+MAX_POINTS_PER_LINE = 1000
 
 # Yahoo Finance user-agent workaround (helps reduce empty/blocked responses)
 try:
@@ -52,35 +41,50 @@ def fetch_close_prices(tickers: list[str], start_dt: date, end_dt: date) -> pd.D
       columns = tickers
       values = Close
     end_dt inclusive in UI; yfinance 'end' exclusive => +1 day
+    Tickers whose fresh disk copy covers the range are sliced from it; only the rest are downloaded.
     """
-    start = pd.to_datetime(start_dt)
-    end_exclusive = pd.to_datetime(end_dt) + pd.Timedelta(days=1)
-
-    data = yf.download(
-        tickers=tickers,
-        start=start,
-        end=end_exclusive,
-        progress=False,
-        threads=True,
-        group_by="column",
-        auto_adjust=False,
-    )
-
-    if data is None or data.empty:
+    closes = {}
+    for ticker in tickers:
+        cached = read_cached_range(f"{ticker}_close", CLOSE_DISK_TTL, start_dt, end_dt)
+        if cached is not None:
+            closes[ticker] = cached[ticker]
+    missing = [t for t in tickers if t not in closes]
+
+    if missing:
+        start = pd.to_datetime(start_dt)
+        end_exclusive = pd.to_datetime(end_dt) + pd.Timedelta(days=1)
+
+        data = yf.download(
+            tickers=missing,
+            start=start,
+            end=end_exclusive,
+            progress=False,
+            threads=True,
+            group_by="column",
+            auto_adjust=False,
+            session=SESSION,
+        )
+
+        close = pd.DataFrame()
+        if data is not None and not data.empty:
+            if isinstance(data.columns, pd.MultiIndex):
+                # (field, ticker)
+                if "Close" in data.columns.get_level_values(0):
+                    close = data["Close"]
+            elif "Close" in data.columns:
+                # single ticker
+                close = data[["Close"]].set_axis([missing[0]], axis=1)
+
+        for ticker in close.columns:
+            series = close[ticker].dropna()
+            closes[ticker] = series
+            if not series.empty:
+                write_cached_range(f"{ticker}_close", series.to_frame(ticker), start_dt, end_dt, CLOSE_DISK_TTL)
+
+    if not closes:
         return pd.DataFrame()
 
-    if isinstance(data.columns, pd.MultiIndex):
-        # (field, ticker)
-        if "Close" not in data.columns.get_level_values(0):
-            return pd.DataFrame()
-        close = data["Close"].copy()
-    else:
-        # single ticker
-        if "Close" not in data.columns:
-            return pd.DataFrame()
-        close = data[["Close"]].copy()
-        close.columns = [tickers[0]]
-
+    close = pd.DataFrame({t: closes[t] for t in tickers if t in closes})
     close.index = pd.to_datetime(close.index)
     close = close.sort_index()
     return close
@@ -90,39 +94,31 @@ def compute_perf_table(close_wide: pd.DataFrame) -> pd.DataFrame:
     """
     Start vs End + Peak for each company.
     """
-    rows = []
-    for company in close_wide.columns:
-        s = close_wide[company].dropna()
-        if s.empty:
-            rows.append({
-                "Company": company,
-                "Start Close": None,
-                "End Close": None,
-                "Diff (RM)": None,
-                "% Diff": None,
-                "Peak Close": None,
-                "Peak Date": None,
-            })
-            continue
-
-        start_close = float(s.iloc[0])
-        end_close = float(s.iloc[-1])
-        diff = end_close - start_close
-        pct = (diff / start_close) * 100 if start_close != 0 else None
-
-        peak_close = float(s.max())
-        peak_dt = s.idxmax()
-        peak_date = peak_dt.date() if hasattr(peak_dt, "date") else peak_dt
-
-        rows.append({
-            "Company": company,
-            "Start Close": start_close,
-            "End Close": end_close,
-            "Diff (RM)": diff,
-            "% Diff": pct,
-            "Peak Close": peak_close,
-            "Peak Date": peak_date,
-        })
+    values = close_wide.to_numpy(dtype=float)
+    has = ~np.isnan(values)
+    has_any = has.any(axis=0)
+    cols = np.arange(values.shape[1])
+
+    # Row of the first / last non-NaN close and of the peak, per company column
+    first_pos = has.argmax(axis=0)
+    last_pos = len(values) - 1 - has[::-1].argmax(axis=0)
+    peak_pos = np.where(has, values, -np.inf).argmax(axis=0)
+
+    start_close = np.where(has_any, values[first_pos, cols], np.nan)
+    end_close = np.where(has_any, values[last_pos, cols], np.nan)
+    diff = end_close - start_close
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(start_close != 0, diff / start_close * 100, np.nan)
+
+    rows = {
+        "Company": close_wide.columns,
+        "Start Close": start_close,
+        "End Close": end_close,
+        "Diff (RM)": diff,
+        "% Diff": pct,
+        "Peak Close": np.where(has_any, values[peak_pos, cols], np.nan),
+        "Peak Date": np.where(has_any, close_wide.index[peak_pos].date, None),
+    }
 
     df = pd.DataFrame(rows)
     df["_sort"] = df["% Diff"].fillna(-10**18)
@@ -130,6 +126,51 @@ def compute_perf_table(close_wide: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+@st.cache_data(show_spinner=False)
+def build_price_figure(close_wide: pd.DataFrame):
+    """Closing price lines; cached so reruns on the same prices skip the downsample and Plotly build."""
+    ordered = list(close_wide.columns)
+
+    # Chart-only long frame, company-major like a melt, built straight from the
+    # wide arrays: float32 is ample for sen-level prices and halves the Plotly
+    # payload; Company as a categorical keeps the selection order
+    values = close_wide.to_numpy(dtype="float32").T
+    keep = ~np.isnan(values)
+
+    # Multi-year ranges: keep the LTTB shape of each line instead of every trading day
+    x = close_wide.index.asi8.astype(float)
+    for row, has in zip(values, keep):
+        pos = np.flatnonzero(has)
+        if len(pos) > MAX_POINTS_PER_LINE:
+            has[:] = False
+            has[pos[lttb_indices(x[pos], row[pos], MAX_POINTS_PER_LINE)]] = True
+
+    df_long = pd.DataFrame({
+        "Date": np.broadcast_to(close_wide.index.to_numpy(), values.shape)[keep],
+        "Company": pd.Categorical.from_codes(
+            np.broadcast_to(np.arange(len(ordered))[:, None], values.shape)[keep],
+            categories=ordered,
+        ),
+        "Close": values[keep],
+    })
+
+    fig = px.line(
+        df_long,
+        x="Date",
+        y="Close",
+        color="Company",
+        title="Closing Price Comparison",
+    )
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Closing Price (MYR)",
+        legend_title="Company",
+        margin=dict(l=10, r=10, t=60, b=10),
+    )
+    fig.update_xaxes(rangeslider_visible=True)
+    return fig
+
+
 def enforce_base_first(selected: list[str]) -> list[str]:
     """
     Always keep LBS present and first.
@@ -138,6 +179,13 @@ def enforce_base_first(selected: list[str]) -> list[str]:
     return [BASE_COMPANY] + cleaned
 
 
+def keep_base_selected():
+    """
+    Multiselect on_change: restore LBS before the rerun instead of st.rerun() after it.
+    """
+    st.session_state.company_selector = enforce_base_first(st.session_state.company_selector)
+
+
 # ─────────────────────────────────────────────────────────────
 # APP
 # ─────────────────────────────────────────────────────────────
@@ -160,18 +208,13 @@ def main():
         st.session_state.company_selector = [BASE_COMPANY]
 
     # --- Companies selector (next line) ---
-    selected_companies = st.multiselect(
+    st.multiselect(
         "Select Companies (LBS Bina is always included)",
         options=list(ALL_COMPANIES.keys()),
         key="company_selector",
+        on_change=keep_base_selected,
     )
 
-    # Enforce LBS always selected (safe way: update state + rerun)
-    enforced = enforce_base_first(selected_companies)
-    if enforced != selected_companies:
-        st.session_state.company_selector = enforced
-        st.rerun()
-
     # Button
     get_data = st.button("Get Data", type="primary")
 
@@ -206,41 +249,21 @@ def main():
     st.subheader("📌 Start vs End Performance (with Peak)")
     metrics = compute_perf_table(close_wide)
 
-    pretty = metrics.copy()
-    pretty["Start Close"] = pretty["Start Close"].map(lambda x: f"{x:,.3f}" if pd.notna(x) else "—")
-    pretty["End Close"] = pretty["End Close"].map(lambda x: f"{x:,.3f}" if pd.notna(x) else "—")
-    pretty["Diff (RM)"] = pretty["Diff (RM)"].map(lambda x: f"{x:,.3f}" if pd.notna(x) else "—")
-    pretty["% Diff"] = pretty["% Diff"].map(lambda x: f"{x:,.2f}%" if pd.notna(x) else "—")
-    pretty["Peak Close"] = pretty["Peak Close"].map(lambda x: f"{x:,.3f}" if pd.notna(x) else "—")
-    pretty["Peak Date"] = pretty["Peak Date"].map(lambda x: str(x) if pd.notna(x) else "—")
+    pretty = metrics.assign(**{
+        "Start Close": metrics["Start Close"].map(lambda x: f"{x:,.3f}" if pd.notna(x) else "—"),
+        "End Close": metrics["End Close"].map(lambda x: f"{x:,.3f}" if pd.notna(x) else "—"),
+        "Diff (RM)": metrics["Diff (RM)"].map(lambda x: f"{x:,.3f}" if pd.notna(x) else "—"),
+        "% Diff": metrics["% Diff"].map(lambda x: f"{x:,.2f}%" if pd.notna(x) else "—"),
+        "Peak Close": metrics["Peak Close"].map(lambda x: f"{x:,.3f}" if pd.notna(x) else "—"),
+        "Peak Date": metrics["Peak Date"].map(lambda x: str(x) if pd.notna(x) else "—"),
+    })
 
     st.dataframe(pretty, use_container_width=True, hide_index=True)
 
     # --- Chart ---
     st.subheader("📉 Closing Price Comparison")
 
-    df_long = (
-        close_wide.reset_index()
-        .rename(columns={"index": "Date"})
-        .melt(id_vars="Date", var_name="Company", value_name="Close")
-        .dropna()
-    )
-
-    fig = px.line(
-        df_long,
-        x="Date",
-        y="Close",
-        color="Company",
-        title="Closing Price Comparison",
-    )
-    fig.update_layout(
-        xaxis_title="Date",
-        yaxis_title="Closing Price (MYR)",
-        legend_title="Company",
-        margin=dict(l=10, r=10, t=60, b=10),
-    )
-    fig.update_xaxes(rangeslider_visible=True)
-
+    fig = build_price_figure(close_wide)
     st.plotly_chart(fig, use_container_width=True)
 
 
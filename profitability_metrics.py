@@ -1,8 +1,11 @@
 # pages/financial_ratios.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 import yfinance as yf
 import plotly.graph_objects as go
+from yf_session import SESSION
+from concurrent_fetch import run_concurrently
 from financials import companies, fetch_quarterly_financials
 
 # ─────────────────────────────────────────────────────────────
@@ -11,14 +14,14 @@ from financials import companies, fetch_quarterly_financials
 @st.cache_data(ttl=3600, show_spinner=False)
 def fetch_ticker_info(ticker_code: str) -> dict:
     try:
-        return yf.Ticker(ticker_code).info or {}
+        return yf.Ticker(ticker_code, session=SESSION).info or {}
     except Exception:
         return {}
 
 @st.cache_data(ttl=3600, show_spinner=False)
 def fetch_quarterly_cashflow(ticker_code: str) -> pd.DataFrame:
     try:
-        df = yf.Ticker(ticker_code).quarterly_cashflow
+        df = yf.Ticker(ticker_code, session=SESSION).quarterly_cashflow
         if df is None or df.empty:
             return pd.DataFrame()
         df.columns = pd.to_datetime(df.columns, errors="coerce")
@@ -29,7 +32,7 @@ def fetch_quarterly_cashflow(ticker_code: str) -> pd.DataFrame:
 @st.cache_data(ttl=3600, show_spinner=False)
 def fetch_balance_sheet_raw(ticker_code: str) -> pd.DataFrame:
     try:
-        df = yf.Ticker(ticker_code).quarterly_balance_sheet
+        df = yf.Ticker(ticker_code, session=SESSION).quarterly_balance_sheet
         if df is None or df.empty:
             return pd.DataFrame()
         df.columns = pd.to_datetime(df.columns, errors="coerce")
@@ -87,92 +90,98 @@ def _ratio(num, den):
     return (num / den) if (pd.notna(num) and pd.notna(den) and den != 0) else float("nan")
 
 
+def _row(df, row, cols) -> np.ndarray:
+    """Whole statement row as a float array over cols (NaN when the row is missing)."""
+    if row in df.index:
+        return df.loc[row, cols].to_numpy(dtype=float)
+    return np.full(len(cols), np.nan)
+
+def _pct_vec(num, den) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den != 0, num / den * 100, np.nan)
+
+def _ratio_vec(num, den) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den != 0, num / den, np.nan)
+
+
 def calc_profitability(fin: pd.DataFrame) -> pd.DataFrame:
-    metrics = [
-        "Gross Margin (%)", "Operating Margin (%)", "Pretax Margin (%)",
-        "PAT Margin (%)", "PATMI Margin (%)", "EBITDA Margin (%)",
-        "Effective Tax Rate (%)", "Interest Coverage (x)",
-    ]
-    out = pd.DataFrame(index=metrics, columns=fin.columns, dtype=float)
-    for col in fin.columns:
-        rev    = _get(fin, "Total Revenue", col)
-        gp     = _get(fin, "Gross Profit", col)
-        opex   = _get(fin, "Operating Expense", col)
-        pbt    = _get(fin, "Pretax Income", col)
-        tax    = _get(fin, "Tax Provision", col)
-        ebitda = _get(fin, "EBITDA", col)
-        intexp = _get(fin, "Interest Expense", col)
-        patmi  = _get(fin, "Net Income From Continuing Operation Net Minority Interest", col)
-
-        out.loc["Gross Margin (%)",       col] = _pct(gp, rev)
-        out.loc["Operating Margin (%)",   col] = _pct(gp - opex if pd.notna(gp) and pd.notna(opex) else float("nan"), rev)
-        out.loc["Pretax Margin (%)",      col] = _pct(pbt, rev)
-        out.loc["PAT Margin (%)",         col] = _pct(pbt - tax if pd.notna(pbt) and pd.notna(tax) else float("nan"), rev)
-        out.loc["PATMI Margin (%)",       col] = _pct(patmi, rev)
-        out.loc["EBITDA Margin (%)",      col] = _pct(ebitda, rev)
-        out.loc["Effective Tax Rate (%)", col] = _pct(tax, pbt)
-        out.loc["Interest Coverage (x)",  col] = _ratio(intexp, pbt)
-    return out.apply(pd.to_numeric, errors="coerce")
+    cols   = fin.columns
+    rev    = _row(fin, "Total Revenue", cols)
+    gp     = _row(fin, "Gross Profit", cols)
+    opex   = _row(fin, "Operating Expense", cols)
+    pbt    = _row(fin, "Pretax Income", cols)
+    tax    = _row(fin, "Tax Provision", cols)
+    ebitda = _row(fin, "EBITDA", cols)
+    intexp = _row(fin, "Interest Expense", cols)
+    patmi  = _row(fin, "Net Income From Continuing Operation Net Minority Interest", cols)
+
+    out = {
+        "Gross Margin (%)":       _pct_vec(gp, rev),
+        "Operating Margin (%)":   _pct_vec(gp - opex, rev),
+        "Pretax Margin (%)":      _pct_vec(pbt, rev),
+        "PAT Margin (%)":         _pct_vec(pbt - tax, rev),
+        "PATMI Margin (%)":       _pct_vec(patmi, rev),
+        "EBITDA Margin (%)":      _pct_vec(ebitda, rev),
+        "Effective Tax Rate (%)": _pct_vec(tax, pbt),
+        "Interest Coverage (x)":  _ratio_vec(intexp, pbt),
+    }
+    return pd.DataFrame(np.vstack(list(out.values())), index=list(out), columns=cols)
 
 
 def calc_liquidity(bs: pd.DataFrame) -> pd.DataFrame:
     # bs is raw (full RM), ratios are unitless so no scaling needed
-    metrics = ["Current Ratio (x)", "Quick Ratio (x)"]
-    out = pd.DataFrame(index=metrics, columns=bs.columns, dtype=float)
-    for col in bs.columns:
-        ca  = _get(bs, "Current Assets", col)
-        inv = _get(bs, "Inventory", col)
-        cl  = _get(bs, "Current Liabilities", col)
-        inv = 0.0 if pd.isna(inv) else inv
-        out.loc["Current Ratio (x)", col] = _ratio(ca, cl)
-        out.loc["Quick Ratio (x)",   col] = _ratio(ca - inv, cl)
-    return out.apply(pd.to_numeric, errors="coerce")
+    cols = bs.columns
+    ca   = _row(bs, "Current Assets", cols)
+    inv  = _row(bs, "Inventory", cols)
+    cl   = _row(bs, "Current Liabilities", cols)
+    inv  = np.where(np.isnan(inv), 0.0, inv)
+
+    out = {
+        "Current Ratio (x)": _ratio_vec(ca, cl),
+        "Quick Ratio (x)":   _ratio_vec(ca - inv, cl),
+    }
+    return pd.DataFrame(np.vstack(list(out.values())), index=list(out), columns=cols)
 
 
 def calc_return(fin: pd.DataFrame, bs: pd.DataFrame) -> pd.DataFrame:
     # fin is in RM thousands; bs is raw RM → divide bs by 1000 to match
-    metrics = ["Return on Equity (%)", "Return on Assets (%)"]
-    common  = fin.columns.intersection(bs.columns)
-    out     = pd.DataFrame(index=metrics, columns=common, dtype=float)
-    for col in common:
-        ni = _get(fin, "Net Income Common Stockholders", col)          # RM thousands
-        eq = _get(bs,  "Total Equity Gross Minority Interest", col)    # raw RM → /1000
-        ta = _get(bs,  "Total Assets", col)                            # raw RM → /1000
-        eq = eq / 1000 if pd.notna(eq) else float("nan")
-        ta = ta / 1000 if pd.notna(ta) else float("nan")
-        out.loc["Return on Equity (%)", col] = _pct(ni, eq)
-        out.loc["Return on Assets (%)", col] = _pct(ni, ta)
-    return out.apply(pd.to_numeric, errors="coerce")
+    common = fin.columns.intersection(bs.columns)
+    ni = _row(fin, "Net Income Common Stockholders", common)               # RM thousands
+    eq = _row(bs,  "Total Equity Gross Minority Interest", common) / 1000  # raw RM → thousands
+    ta = _row(bs,  "Total Assets", common) / 1000                          # raw RM → thousands
+
+    out = {
+        "Return on Equity (%)": _pct_vec(ni, eq),
+        "Return on Assets (%)": _pct_vec(ni, ta),
+    }
+    return pd.DataFrame(np.vstack(list(out.values())), index=list(out), columns=common)
 
 
 def calc_solvency(bs: pd.DataFrame) -> pd.DataFrame:
     # all from bs, same units, ratios are unitless
-    metrics = [
-        "Debt / Equity (Owners) (x)", "Debt / Total Equity (x)",
-        "Net Debt / Equity (Owners) (x)", "Net Debt / Total Equity (x)",
-    ]
-    out = pd.DataFrame(index=metrics, columns=bs.columns, dtype=float)
-    for col in bs.columns:
-        td  = _get(bs, "Total Debt", col)
-        cse = _get(bs, "Common Stock Equity", col)
-        te  = _get(bs, "Total Equity Gross Minority Interest", col)
-        nd  = _get(bs, "Net Debt", col)
-        out.loc["Debt / Equity (Owners) (x)",     col] = _ratio(td, cse)
-        out.loc["Debt / Total Equity (x)",         col] = _ratio(td, te)
-        out.loc["Net Debt / Equity (Owners) (x)", col] = _ratio(nd, cse)
-        out.loc["Net Debt / Total Equity (x)",     col] = _ratio(nd, te)
-    return out.apply(pd.to_numeric, errors="coerce")
-
-
-def calc_valuation(fin: pd.DataFrame, bs: pd.DataFrame, ticker_code: str) -> pd.DataFrame:
+    cols = bs.columns
+    td   = _row(bs, "Total Debt", cols)
+    cse  = _row(bs, "Common Stock Equity", cols)
+    te   = _row(bs, "Total Equity Gross Minority Interest", cols)
+    nd   = _row(bs, "Net Debt", cols)
+
+    out = {
+        "Debt / Equity (Owners) (x)":     _ratio_vec(td, cse),
+        "Debt / Total Equity (x)":        _ratio_vec(td, te),
+        "Net Debt / Equity (Owners) (x)": _ratio_vec(nd, cse),
+        "Net Debt / Total Equity (x)":    _ratio_vec(nd, te),
+    }
+    return pd.DataFrame(np.vstack(list(out.values())), index=list(out), columns=cols)
+
+
+def calc_valuation(fin: pd.DataFrame, bs: pd.DataFrame, info: dict, cf_raw: pd.DataFrame) -> pd.DataFrame:
     # fin in RM thousands; bs raw RM; market cap in native currency (RM)
     metrics = [
         "Enterprise Multiple (x)", "P/E Ratio (x)",
         "Price / Book (x)", "Price / Revenue (x)", "Price / Cashflow (x)",
     ]
     out    = pd.DataFrame(index=metrics, columns=fin.columns, dtype=float)
-    info   = fetch_ticker_info(ticker_code)
-    cf_raw = fetch_quarterly_cashflow(ticker_code)
     mc     = info.get("marketCap", None)   # full RM
     pe     = info.get("trailingPE", None)
 
@@ -540,14 +549,13 @@ def main():
         st.info("Select at least one company.")
         return
 
+    tickers = {comp: companies[comp] for comp in selected_companies if comp in companies}
+
     with st.spinner("Loading quarters…"):
         all_q: set = set()
-        for comp in selected_companies:
-            tk = companies.get(comp)
-            if not tk:
-                continue
-            df_tmp = fetch_quarterly_financials(tk)
-            if not df_tmp.empty:
+        fin_all = run_concurrently({comp: (fetch_quarterly_financials, tk) for comp, tk in tickers.items()}, max_workers=16)
+        for df_tmp in fin_all.values():
+            if df_tmp is not None and not df_tmp.empty:
                 all_q.update([c for c in df_tmp.columns if pd.notna(c)])
         quarters_sorted = sorted(all_q, reverse=True)
 
@@ -562,22 +570,30 @@ def main():
 
     # ── Fetch button ──────────────────────────────────────────
     if st.button("Calculate Ratios", type="primary", key="ratios_calc_btn"):
-        fin_data = {}
-        bs_data  = {}
-        tk_codes = {}
+        fin_data  = {}
+        bs_data   = {}
+        info_data = {}
+        cf_data   = {}
         with st.spinner(f"Fetching data for {len(selected_companies)} companies…"):
-            for comp in selected_companies:
-                tk_code = companies.get(comp)
-                if not tk_code:
-                    continue
-                df_fin = fetch_quarterly_financials(tk_code)
-                bs_raw = fetch_balance_sheet_raw(tk_code)
-                if df_fin.empty or bs_raw.empty:
+            # Financials were already loaded for the quarter list above; fetch the rest once here
+            jobs = {}
+            for comp, tk_code in tickers.items():
+                jobs[(comp, "bs")]   = (fetch_balance_sheet_raw, tk_code)
+                jobs[(comp, "info")] = (fetch_ticker_info, tk_code)
+                jobs[(comp, "cf")]   = (fetch_quarterly_cashflow, tk_code)
+            fetched = run_concurrently(jobs, max_workers=16)
+
+            for comp in tickers:
+                df_fin = fin_all.get(comp)
+                bs_raw = fetched.get((comp, "bs"))
+                if df_fin is None or bs_raw is None or df_fin.empty or bs_raw.empty:
                     st.warning(f"Incomplete data for {comp}, skipping.")
                     continue
-                fin_data[comp] = df_fin
-                bs_data[comp]  = bs_raw
-                tk_codes[comp] = tk_code
+                fin_data[comp]  = df_fin
+                bs_data[comp]   = bs_raw
+                info_data[comp] = fetched.get((comp, "info")) or {}
+                cf_raw          = fetched.get((comp, "cf"))
+                cf_data[comp]   = cf_raw if cf_raw is not None else pd.DataFrame()
 
         if not fin_data:
             st.error("No data could be loaded.")
@@ -588,7 +604,7 @@ def main():
         st.session_state["ratios_liq_map"]   = {c: calc_liquidity(bs_data[c])                         for c in comp_list}
         st.session_state["ratios_ret_map"]   = {c: calc_return(fin_data[c], bs_data[c])               for c in comp_list}
         st.session_state["ratios_solv_map"]  = {c: calc_solvency(bs_data[c])                          for c in comp_list}
-        st.session_state["ratios_val_map"]   = {c: calc_valuation(fin_data[c], bs_data[c], tk_codes[c]) for c in comp_list}
+        st.session_state["ratios_val_map"]   = {c: calc_valuation(fin_data[c], bs_data[c], info_data[c], cf_data[c]) for c in comp_list}
         st.session_state["ratios_comp_list"] = comp_list
 
     if "ratios_prof_map" not in st.session_state:
@@ -0,0 +1,58 @@
+# statement_table.py
+# Rendering pieces shared by the statement comparison pages (income statement, balance sheet, cash flow).
+import pandas as pd
+import streamlit as st
+
+
+def statement_table_styles(row_heading_min_width: str) -> list:
+    """Dark-theme CSS for a comparison table; only the row-heading column width differs between pages."""
+    return [
+        {
+            "selector": "thead th",
+            "props": [
+                ("background-color", "#1e1e1e"),
+                ("color", "white"),
+                ("font-size", "12px"),
+                ("white-space", "nowrap"),
+                ("padding", "8px 10px"),
+            ],
+        },
+        {
+            "selector": "tbody td",
+            "props": [
+                ("background-color", "#121212"),
+                ("color", "white"),
+                ("font-size", "13px"),
+                ("padding", "6px 10px"),
+                ("text-align", "right"),
+                ("font-variant-numeric", "tabular-nums"),
+            ],
+        },
+        {
+            "selector": "tbody tr:hover td",
+            "props": [("background-color", "#1e2d40")],
+        },
+        {
+            "selector": "th.row_heading",
+            "props": [
+                ("background-color", "#121212"),
+                ("color", "#d1d5db"),
+                ("font-size", "12px"),
+                ("font-weight", "500"),
+                ("padding", "6px 12px"),
+                ("white-space", "nowrap"),
+                ("min-width", row_heading_min_width),
+                ("text-align", "left"),
+            ],
+        },
+    ]
+
+
+@st.cache_data(show_spinner=False)
+def build_csv_bytes(df_raw: pd.DataFrame, _fmt_values) -> bytes:
+    """Formatted raw values (no variance cols) as CSV bytes, built once per table.
+
+    _fmt_values is the page's df_raw -> strings formatter; it isn't hashed, but each page's
+    df_raw carries its own row labels, so pages never share a cache entry.
+    """
+    return _fmt_values(df_raw).to_csv().encode("utf-8")
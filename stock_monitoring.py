@@ -1,37 +1,83 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import yfinance as yf
 from datetime import date
 import plotly.express as px
+from yf_session import SESSION
+from file_cache import read_cached, write_cached
+from tickers import BASE_COMPANY, COMPANIES
+from downsample import lttb_indices
+
+HISTORY_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+HISTORY_DISK_TTL = 60 * 60
+
+BASE_TICKER = COMPANIES[BASE_COMPANY]
+COMPETITORS = {name: code for name, code in COMPANIES.items() if name != BASE_COMPANY}
+
+# Points per company line on the charts; longer series are LTTB-downsampled
+MAX_POINTS_PER_LINE = 1000
 
 # --- Fetch Data Function ---
-def fetch_data(ticker, start, end):
-    return yf.Ticker(ticker).history(start=start, end=end)
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_data_bulk(tickers, start, end):
+    """Daily history for every ticker in a single yf.download call, split into {ticker: DataFrame}.
+
+    Tickers with a fresh copy in the disk cache are served from it; only the rest are downloaded.
+    """
+    params = {"start": start, "end": end}
+    out = {}
+    for ticker in tickers:
+        cached = read_cached(f"{ticker}_history", HISTORY_DISK_TTL, params)
+        if cached is not None:
+            out[ticker] = cached
+    missing = [t for t in tickers if t not in out]
+    if not missing:
+        return out
+
+    raw = yf.download(
+        missing, start=start, end=end,
+        group_by="ticker", actions=True, auto_adjust=True,
+        threads=True, progress=False, session=SESSION,
+    )
+    for ticker in missing:
+        if raw is None or raw.empty or ticker not in raw.columns.get_level_values(0):
+            out[ticker] = pd.DataFrame(columns=HISTORY_COLUMNS)
+            continue
+        # download aligns all tickers on one date index; drop the days this one didn't trade
+        df = raw[ticker].dropna(subset=["Close"])
+        out[ticker] = df[[c for c in HISTORY_COLUMNS if c in df.columns]].rename_axis(columns=None)
+        if not out[ticker].empty:
+            write_cached(f"{ticker}_history", out[ticker], params)
+    return out
+
+def downsample_lines(df_all, y):
+    """Rows of df_all to plot as one line of y per company, each capped at MAX_POINTS_PER_LINE by LTTB."""
+    x = df_all["Date"].to_numpy().view("int64")
+    values = df_all[y].to_numpy(dtype=float)
+    keep = []
+    for pos in df_all.groupby("Company", observed=True, sort=False).indices.values():
+        if len(pos) > MAX_POINTS_PER_LINE:
+            pos = pos[lttb_indices(x[pos], values[pos], MAX_POINTS_PER_LINE)]
+        keep.append(pos)
+    if not keep:
+        return df_all
+    return df_all.iloc[np.sort(np.concatenate(keep))]
+
+@st.cache_data(show_spinner=False)
+def build_line_figure(df_lines: pd.DataFrame, y: str, title: str):
+    """One line of y per company; cached so reruns on the same history skip the downsample and Plotly build."""
+    return px.line(
+        downsample_lines(df_lines, y),
+        x="Date", y=y, color="Company",
+        title=title,
+        width=800, height=500
+    )
 
 # --- Main App ---
 def main():
     st.title("📈 Competitor Stock Monitoring – LBS Bina as Base")
 
-    # Base company (LBS Bina)
-    base_ticker = "5789.KL"
-
-    # Competitors list
-    competitors = {
-        "S P Setia": "8664.KL",
-        "Sime Darby Property": "5288.KL",
-        "Eco World": "8206.KL",
-        "UEM Sunrise": "5148.KL",
-        "IOI Properties": "5249.KL",
-        "Mah Sing": "8583.KL",
-        "IJM Corporation": "3336.KL",
-        "Sunway": "5211.KL",
-        "Gamuda": "5398.KL",
-        "OSK Holdings": "5053.KL",
-        "UOA Development": "5200.KL",
-        "Matrix Concepts": "5236.KL",
-        "Lagenda Properties" : "7179.KL",
-    }
-
     # Date inputs
     start = st.date_input("Start date", value=date(2020, 1, 1), key="monitoring_start")
     end = st.date_input("End date", value=date.today(), key="monitoring_end")
@@ -40,49 +86,42 @@ def main():
     # Select competitors
     selected_competitors = st.multiselect(
         "Select competitors to compare against LBS Bina",
-        list(competitors.keys())
+        list(COMPETITORS.keys())
     )
 
     if st.button("Get Historical Data"):
         try:
-            # Fetch base company data
-            df_base = fetch_data(base_ticker, start, end + pd.Timedelta(days=1))
-            df_base["Company"] = "LBS Bina"
-
-            # Store all dataframes
-            dfs = [df_base]
-
-            # Fetch competitors
-            for comp in selected_competitors:
-                ticker = competitors[comp]
-                df = fetch_data(ticker, start, end + pd.Timedelta(days=1))
-                df["Company"] = comp
-                dfs.append(df)
-
-            # Combine into single dataframe
-            df_all = pd.concat(dfs, keys=[d["Company"].iloc[0] for d in dfs]).reset_index()
+            # Fetch base company and competitors in one request
+            tickers = {BASE_TICKER} | {COMPETITORS[comp] for comp in selected_competitors}
+            with st.spinner(f"Fetching price history for {len(tickers)} companies…"):
+                histories = fetch_data_bulk(tuple(sorted(tickers)), start, end + pd.Timedelta(days=1))
+
+            # Combine into a single long dataframe straight from the column arrays, with
+            # Company as a categorical from the start (LBS Bina first) so every groupby below stays categorical
+            companies = {BASE_COMPANY: BASE_TICKER, **{comp: COMPETITORS[comp] for comp in selected_competitors}}
+            frames = [histories[tk].reindex(columns=HISTORY_COLUMNS) for tk in companies.values()]
+            # Empty histories add no rows, and their object columns would otherwise upcast every column
+            rows = [f for f in frames if len(f)] or frames
+            df_all = pd.DataFrame({
+                "Date": np.concatenate([f.index.to_numpy(dtype="datetime64[ns]") for f in rows]),
+                **{col: np.concatenate([f[col].to_numpy() for f in rows]) for col in HISTORY_COLUMNS},
+                "Company": pd.Categorical.from_codes(
+                    np.repeat(np.arange(len(frames), dtype=np.int8), [len(f) for f in frames]),
+                    categories=list(companies),
+                ),
+            })
 
             # --- Side by Side Charts ---
             col1, col2 = st.columns(2)
 
             with col1:
                 st.subheader("Closing Price Comparison")
-                fig_close = px.line(
-                    df_all,
-                    x="Date", y="Close", color="Company",
-                    title="Closing Price",
-                    width=800, height=500
-                )
+                fig_close = build_line_figure(df_all[["Date", "Close", "Company"]], "Close", "Closing Price")
                 st.plotly_chart(fig_close, use_container_width=True)
 
             with col2:
                 st.subheader("Volume Comparison")
-                fig_vol = px.line(
-                    df_all,
-                    x="Date", y="Volume", color="Company",
-                    title="Trading Volume",
-                    width=800, height=500
-                )
+                fig_vol = build_line_figure(df_all[["Date", "Volume", "Company"]], "Volume", "Trading Volume")
                 st.plotly_chart(fig_vol, use_container_width=True)
 
             # --- Historical Data at Bottom ---
@@ -103,9 +142,8 @@ def main():
 
             # Closing Price Insights
             st.markdown("### Closing Price Explanation")
-            first_closes = df_all.groupby('Company')['Close'].first()
-            last_closes = df_all.groupby('Company')['Close'].last()
-            pct_changes = ((last_closes - first_closes) / first_closes * 100).sort_values(ascending=False)
+            closes = df_all.groupby('Company', observed=True, sort=False)['Close'].agg(['first', 'last'])
+            pct_changes = ((closes['last'] - closes['first']) / closes['first'] * 100).sort_values(ascending=False)
 
             st.write("This section analyzes the daily closing prices for LBS Bina and selected competitors over the chosen period. Key insights:")
             st.write("- **Trends**: Upward price movements indicate growth, while downward or flat trends suggest declines or stability.")
@@ -130,8 +168,9 @@ def main():
 
             # Volume Insights
             st.markdown("### Volume Explanation")
-            avg_volumes = df_all.groupby('Company')['Volume'].mean().sort_values(ascending=False)
-            max_volumes = df_all.groupby('Company')['Volume'].max()
+            volume_stats = df_all.groupby('Company', observed=True, sort=False)['Volume'].agg(['mean', 'max'])
+            avg_volumes = volume_stats['mean'].sort_values(ascending=False)
+            max_volumes = volume_stats['max']
 
             st.write("This section examines trading volumes over time. Volume spikes often signal high interest, news events, or market reactions. Steady volumes suggest consistent trading activity.")
             st.write("Average Trading Volumes:")
@@ -145,8 +184,8 @@ def main():
 
             # Volatility Insights
             st.markdown("### Stock Volatility (Annualized)")
-            df_all['Daily_Return'] = df_all.groupby('Company')['Close'].pct_change()
-            volatilities = (df_all.groupby('Company')['Daily_Return'].std() * (252 ** 0.5)).sort_values(ascending=False)
+            df_all['Daily_Return'] = df_all.groupby('Company', observed=True, sort=False)['Close'].pct_change()
+            volatilities = (df_all.groupby('Company', observed=True, sort=False)['Daily_Return'].std() * (252 ** 0.5)).sort_values(ascending=False)
 
             st.write("Volatility measures how much a stock’s price fluctuates, indicating risk. Higher values mean larger price swings (higher risk/reward). Calculated from daily returns, annualized.")
             st.write("Annualized Volatility:")
@@ -176,9 +215,9 @@ def main():
 
             # Moving Average Trends
             st.markdown("### Moving Average Trends (50-Day)")
-            df_all['MA50'] = df_all.groupby('Company')['Close'].rolling(window=50, min_periods=1).mean().reset_index(level=0, drop=True)
+            df_all['MA50'] = df_all.groupby('Company', observed=True, sort=False)['Close'].rolling(window=50, min_periods=1).mean().reset_index(level=0, drop=True)
             df_all['Above_MA50'] = df_all['Close'] > df_all['MA50']
-            ma_trends = df_all.groupby('Company')['Above_MA50'].mean() * 100
+            ma_trends = df_all.groupby('Company', observed=True, sort=False)['Above_MA50'].mean() * 100
 
             st.write("This section shows the percentage of days each stock’s closing price was above its 50-day moving average, indicating bullish (above) or bearish (below) trends. A higher percentage suggests stronger upward momentum.")
             st.write("Percentage of Days Above 50-Day Moving Average:")
@@ -255,7 +294,7 @@ def main():
 
             # Average Daily Returns
             st.markdown("### Average Daily Returns")
-            avg_daily_returns = (df_all.groupby('Company')['Daily_Return'].mean() * 100).sort_values(ascending=False)
+            avg_daily_returns = (df_all.groupby('Company', observed=True, sort=False)['Daily_Return'].mean() * 100).sort_values(ascending=False)
 
             st.write("This section shows the average daily percentage return for each stock, indicating typical daily performance. Positive values suggest consistent daily gains, while negative values indicate losses.")
             st.write("Average Daily Returns:")
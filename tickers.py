@@ -0,0 +1,21 @@
+# tickers.py
+# Company name → Yahoo Finance ticker, shared by every page
+
+BASE_COMPANY = "LBS Bina"
+
+COMPANIES = {
+    "LBS Bina": "5789.KL",
+    "S P Setia": "8664.KL",
+    "Sime Darby Property": "5288.KL",
+    "Eco World": "8206.KL",
+    "UEM Sunrise": "5148.KL",
+    "IOI Properties": "5249.KL",
+    "Mah Sing": "8583.KL",
+    "IJM Corporation": "3336.KL",
+    "Sunway": "5211.KL",
+    "Gamuda": "5398.KL",
+    "OSK Holdings": "5053.KL",
+    "UOA Development": "5200.KL",
+    "Matrix Concepts": "5236.KL",
+    "Lagenda Properties": "7179.KL",
+}
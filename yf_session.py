@@ -0,0 +1,9 @@
+# yf_session.py
+from curl_cffi import requests as curl_requests
+
+# One process-wide HTTP session shared by every yf.Ticker, so all tabs reuse
+# the same keep-alive connections and Yahoo cookie/crumb instead of each
+# fetch doing its own TLS handshake.
+# Note: yfinance rejects caching sessions (requests_cache), so this is a plain
+# curl_cffi session impersonating Chrome — the same kind yfinance builds itself.
+SESSION = curl_requests.Session(impersonate="chrome")